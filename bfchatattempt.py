@@ -10,125 +10,307 @@ Fixes:
 4. Proper client management and error handling
 """
 
+import re
+import selectors
 import socket
 import threading
 import time
 import sys
 import os
+from collections import OrderedDict
+
+# Numba is optional: without it the engine runs its pure-Python loop
+try:
+    import numba
+    import numpy as np
+except ImportError:
+    numba = None
+
+# Every message on the wire is prefixed with its length as 2 big-endian bytes
+FRAME_HEADER_SIZE = 2
+MAX_FRAME_SIZE = 0xFFFF
+
+# Unsent bytes the server holds for one client before dropping it as too slow
+MAX_OUTBOX_SIZE = 1024 * 1024
+
+# Anything outside printable ASCII (space through '~')
+_NON_PRINTABLE = re.compile(r'[^\x20-\x7e]')
+
+# Compiled programs kept per engine; /bf code is user-supplied, so the
+# cache is a small LRU rather than growing with every distinct program
+COMPILE_CACHE_SIZE = 32
+
+# BF tape size. It is a power of two so the pointer wraps around the ends
+# with a single mask instead of being clamped.
+MEMORY_SIZE = 1024
+MEMORY_MASK = MEMORY_SIZE - 1
+
+# Compiled BF opcodes. Runs of '>'/'<' become one OP_MOVE and runs of
+# '+'/'-' one OP_ADD, with the signed count kept in the args array.
+# '[-]' / '[+]' become OP_CLEAR and '[>]' / '[<]' become OP_SCAN.
+(OP_MOVE, OP_ADD, OP_OUTPUT, OP_INPUT,
+ OP_LOOP_START, OP_LOOP_END, OP_CLEAR, OP_SCAN) = range(8)
+
+# ASCII code point -> (opcode, arg), None for characters BF ignores
+_CMD_LUT = [None] * 128
+for _char, _cmd in {'>': (OP_MOVE, 1), '<': (OP_MOVE, -1),
+                    '+': (OP_ADD, 1), '-': (OP_ADD, -1),
+                    '.': (OP_OUTPUT, 0), ',': (OP_INPUT, 0),
+                    '[': (OP_LOOP_START, 0), ']': (OP_LOOP_END, 0)}.items():
+    _CMD_LUT[ord(_char)] = _cmd
+
+# Every byte that isn't a BF command, for stripping comments
+_NON_COMMANDS = bytes(b for b in range(256) if b >= 128 or _CMD_LUT[b] is None)
+
+if numba is not None:
+    @numba.njit(cache=True)
+    def _run_bf(ops, args, memory, inp, in_pos, out_buf, pointer, max_steps):
+        """Native BF loop; returns (output length, steps, pointer, input position)"""
+        n_ops = ops.shape[0]
+        ip = 0
+        steps = 0
+        out_len = 0
+        
+        while ip < n_ops and steps < max_steps:
+            op = ops[ip]
+            
+            if op == OP_MOVE:
+                pointer = (pointer + args[ip]) & MEMORY_MASK
+            elif op == OP_ADD:
+                memory[pointer] = (memory[pointer] + args[ip]) & 0xFF
+            elif op == OP_OUTPUT:
+                out_buf[out_len] = memory[pointer]
+                out_len += 1
+            elif op == OP_INPUT:
+                if in_pos < inp.shape[0]:
+                    memory[pointer] = inp[in_pos]
+                    in_pos += 1
+                else:
+                    memory[pointer] = 0
+            elif op == OP_LOOP_START:
+                if memory[pointer] == 0:
+                    ip = args[ip]
+            elif op == OP_LOOP_END:
+                if memory[pointer] != 0:
+                    ip = args[ip]
+            elif op == OP_CLEAR:
+                memory[pointer] = 0
+            elif op == OP_SCAN:
+                for _ in range(MEMORY_SIZE):
+                    if memory[pointer] == 0:
+                        break
+                    pointer = (pointer + args[ip]) & MEMORY_MASK
+                # No zero cell anywhere: the loop would spin until the limit
+                if memory[pointer] != 0:
+                    steps = max_steps
+            
+            ip += 1
+            steps += 1
+        
+        return out_len, steps, pointer, in_pos
+else:
+    _run_bf = None
 
 class ImprovedBrainfuckEngine:
     """Improved BF interpreter"""
     
     def __init__(self):
+        self._compiled = OrderedDict()
         self.reset()
     
     def reset(self):
-        self.memory = [0] * 1000
+        self.memory = bytearray(MEMORY_SIZE)
         self.pointer = 0
-        self.input_buffer = []
-        self.output_buffer = []
+        self.input_buffer = b''
+        self.input_pos = 0
+        self.output_buffer = bytearray()
     
     def load_input(self, data):
         if isinstance(data, str):
-            self.input_buffer = [ord(c) for c in data[::-1]]
+            self.input_buffer = data.encode('utf-8', 'ignore')
         else:
-            self.input_buffer = list(reversed(data))
+            self.input_buffer = bytes(data)
+        self.input_pos = 0
+    
+    def compile(self, code):
+        """Translate BF code into opcodes plus args (run counts, bracket jumps)"""
+        compiled = self._compiled.get(code)
+        if compiled is not None:
+            self._compiled.move_to_end(code)
+            return compiled
+        
+        ops = []
+        args = []
+        stack = []
+        
+        # Work on bytes (indexing yields ints) and drop comments in one C-level pass
+        code_bytes = code.encode('ascii', 'ignore') if isinstance(code, str) else bytes(code)
+        
+        for byte in code_bytes.translate(None, _NON_COMMANDS):
+            op, arg = _CMD_LUT[byte]
+            
+            # Fold '+'/'-' runs into the previous OP_ADD and '>'/'<' runs into
+            # the previous OP_MOVE (cells and the pointer both wrap)
+            if ops and ops[-1] == op and op <= OP_ADD:
+                args[-1] += arg
+                continue
+            
+            # A loop whose whole body is one op may be a known idiom
+            if op == OP_LOOP_END and stack and stack[-1] == len(ops) - 2:
+                body_op, body_arg = ops[-1], args[-1]
+                idiom = None
+                if body_op == OP_ADD and body_arg % 2 == 1:
+                    # An odd step always reaches zero
+                    idiom = (OP_CLEAR, 0)
+                elif body_op == OP_MOVE and body_arg in (1, -1):
+                    idiom = (OP_SCAN, body_arg)
+                
+                if idiom:
+                    stack.pop()
+                    del ops[-2:], args[-2:]
+                    ops.append(idiom[0])
+                    args.append(idiom[1])
+                    continue
+            
+            index = len(ops)
+            ops.append(op)
+            args.append(arg)
+            
+            if op == OP_LOOP_START:
+                stack.append(index)
+            elif op == OP_LOOP_END:
+                if stack:
+                    start = stack.pop()
+                    args[start] = index
+                    args[index] = start
+                else:
+                    # Unmatched ']' restarts the program, as the old scan did
+                    args[index] = -1
+        
+        # Unmatched '[' skips to the end of the program
+        for start in stack:
+            args[start] = len(ops)
+        
+        if _run_bf is not None:
+            ops = np.array(ops, dtype=np.int8)
+            args = np.array(args, dtype=np.int32)
+        
+        compiled = (ops, args)
+        self._compiled[code] = compiled
+        if len(self._compiled) > COMPILE_CACHE_SIZE:
+            self._compiled.popitem(last=False)
+        return compiled
     
     def execute(self, code, max_steps=50000):
-        """Execute BF code with better error handling"""
-        self.output_buffer = []
+        """Execute BF code; returns False if it hit the step limit"""
+        self.output_buffer = bytearray()
+        ops, args = self.compile(code)
+        
+        if _run_bf is not None:
+            return self._execute_native(ops, args, max_steps)
+        
+        # Locals are cheaper than attribute lookups in the hot loop
+        memory = self.memory
+        input_buffer = self.input_buffer
+        input_len = len(input_buffer)
+        input_pos = self.input_pos
+        output_buffer = self.output_buffer
+        pointer = self.pointer
+        n_ops = len(ops)
         ip = 0
         steps = 0
         
-        try:
-            while ip < len(code) and steps < max_steps:
-                cmd = code[ip]
-                
-                if cmd == '>':
-                    self.pointer = min(self.pointer + 1, len(self.memory) - 1)
-                elif cmd == '<':
-                    self.pointer = max(self.pointer - 1, 0)
-                elif cmd == '+':
-                    self.memory[self.pointer] = (self.memory[self.pointer] + 1) % 256
-                elif cmd == '-':
-                    self.memory[self.pointer] = (self.memory[self.pointer] - 1) % 256
-                elif cmd == '.':
-                    self.output_buffer.append(self.memory[self.pointer])
-                elif cmd == ',':
-                    if self.input_buffer:
-                        self.memory[self.pointer] = self.input_buffer.pop()
-                    else:
-                        self.memory[self.pointer] = 0
-                elif cmd == '[':
-                    if self.memory[self.pointer] == 0:
-                        bracket_count = 1
-                        ip += 1
-                        while ip < len(code) and bracket_count > 0:
-                            if code[ip] == '[':
-                                bracket_count += 1
-                            elif code[ip] == ']':
-                                bracket_count -= 1
-                            ip += 1
-                        ip -= 1
-                elif cmd == ']':
-                    if self.memory[self.pointer] != 0:
-                        bracket_count = 1
-                        ip -= 1
-                        while ip >= 0 and bracket_count > 0:
-                            if code[ip] == ']':
-                                bracket_count += 1
-                            elif code[ip] == '[':
-                                bracket_count -= 1
-                            ip -= 1
-                
-                ip += 1
-                steps += 1
+        while ip < n_ops and steps < max_steps:
+            op = ops[ip]
             
-            return steps < max_steps
+            # Opcodes are 0..7, so branch on ranges rather than testing each in turn
+            if op < OP_OUTPUT:
+                if op == OP_MOVE:
+                    pointer = (pointer + args[ip]) & MEMORY_MASK
+                else:
+                    memory[pointer] = (memory[pointer] + args[ip]) & 0xFF
+            elif op < OP_LOOP_START:
+                if op == OP_OUTPUT:
+                    output_buffer.append(memory[pointer])
+                elif input_pos < input_len:
+                    memory[pointer] = input_buffer[input_pos]
+                    input_pos += 1
+                else:
+                    memory[pointer] = 0
+            elif op < OP_CLEAR:
+                if op == OP_LOOP_START:
+                    if memory[pointer] == 0:
+                        ip = args[ip]
+                elif memory[pointer] != 0:
+                    ip = args[ip]
+            elif op == OP_CLEAR:
+                memory[pointer] = 0
+            else:
+                # Search towards the scan direction, wrapping around the tape
+                if args[ip] > 0:
+                    zero = memory.find(0, pointer)
+                    if zero < 0:
+                        zero = memory.find(0, 0, pointer)
+                else:
+                    zero = memory.rfind(0, 0, pointer + 1)
+                    if zero < 0:
+                        zero = memory.rfind(0, pointer + 1)
+                
+                if zero >= 0:
+                    pointer = zero
+                else:
+                    # No zero cell anywhere: the loop would spin until the limit
+                    steps = max_steps
             
-        except Exception as e:
-            return False
+            ip += 1
+            steps += 1
+        
+        self.pointer = pointer
+        self.input_pos = input_pos
+        return steps < max_steps
+    
+    def _execute_native(self, ops, args, max_steps):
+        """Run compiled code through the numba kernel"""
+        inp = np.frombuffer(self.input_buffer, dtype=np.uint8)
+        out_buf = np.empty(max_steps, dtype=np.uint8)
+        memory = np.frombuffer(self.memory, dtype=np.uint8)
+        
+        out_len, steps, self.pointer, self.input_pos = _run_bf(
+            ops, args, memory, inp, self.input_pos, out_buf, self.pointer, max_steps
+        )
+        
+        self.output_buffer = bytearray(out_buf[:out_len])
+        return steps < max_steps
     
     def get_output_string(self):
-        """Get output as string"""
-        try:
-            return ''.join(chr(b) for b in self.output_buffer if 0 <= b <= 127)
-        except:
-            return ""
+        """Get output as string (bytes outside ASCII are dropped)"""
+        return self.output_buffer.decode('ascii', 'ignore')
 
 class ImprovedBrainfuckChatProtocol:
     """Improved chat protocol"""
     
     def __init__(self):
-        self.bf = ImprovedBrainfuckEngine()
-        
-        # Simple and reliable encryption
-        self.encrypt_program = ",[+.,]"    # Caesar +1
-        self.decrypt_program = ",[-.,]"    # Caesar -1
+        # Simple and reliable encryption: Caesar +1 / -1 like the BF programs
+        # ",[+.,]" and ",[-.,]", but rotating within printable ASCII so '~'
+        # wraps to ' ' and still validates. Other bytes pass through, which
+        # keeps utf-8 intact. The tables are read-only, so one protocol can
+        # be shared by every client.
+        self._enc_table = bytes(32 + (i - 32 + 1) % 95 if 32 <= i <= 126 else i
+                                for i in range(256))
+        self._dec_table = bytes(32 + (i - 32 - 1) % 95 if 32 <= i <= 126 else i
+                                for i in range(256))
     
     def encrypt_message(self, message):
         """Encrypt message"""
         try:
-            self.bf.reset()
-            self.bf.load_input(message)
-            
-            if self.bf.execute(self.encrypt_program):
-                result = self.bf.get_output_string()
-                return result if result else message
-            return message
+            return message.encode('utf-8').translate(self._enc_table).decode('utf-8')
         except:
             return message
     
     def decrypt_message(self, encrypted_message):
         """Decrypt message"""
         try:
-            self.bf.reset()
-            self.bf.load_input(encrypted_message)
-            
-            if self.bf.execute(self.decrypt_program):
-                result = self.bf.get_output_string()
-                return result if result else encrypted_message
-            return encrypted_message
+            return encrypted_message.encode('utf-8').translate(self._dec_table).decode('utf-8')
         except:
             return encrypted_message
     
@@ -137,13 +319,25 @@ class ImprovedBrainfuckChatProtocol:
         try:
             if not message or len(message) > 1000:
                 return False
-            for char in message:
-                if ord(char) < 32 or ord(char) > 126:
-                    return False
-            return True
+            return not _NON_PRINTABLE.search(message)
         except:
             return False
 
+def frame_message(payload):
+    """Prefix an encoded message with its length for the wire"""
+    if len(payload) > MAX_FRAME_SIZE:
+        raise ValueError(f"Message too long ({len(payload)} bytes)")
+    return len(payload).to_bytes(FRAME_HEADER_SIZE, 'big') + payload
+
+def recv_exact(sock, view):
+    """Fill view from a blocking socket; False if the connection closed first"""
+    while view:
+        received = sock.recv_into(view)
+        if not received:
+            return False
+        view = view[received:]
+    return True
+
 class ImprovedChatServer:
     """Improved server with better client management"""
     
@@ -154,7 +348,15 @@ class ImprovedChatServer:
         self.client_counter = 0
         self.protocol = ImprovedBrainfuckChatProtocol()
         self.running = False
-        self.lock = threading.Lock()
+        
+        # All sockets are served from one thread by this selector, so the
+        # client registry and the /bf engine need no locking
+        self.selector = selectors.DefaultSelector()
+        self.bf = ImprovedBrainfuckEngine()
+        
+        # Reused by every read; safe because only the reactor thread reads
+        self.recv_buffer = bytearray(4096)
+        self.recv_view = memoryview(self.recv_buffer)
     
     def start(self):
         """Start server with better error handling"""
@@ -164,6 +366,15 @@ class ImprovedChatServer:
         try:
             server_socket.bind((self.host, self.port))
             server_socket.listen(10)  # Allow more connections
+            server_socket.setblocking(False)
+            self.selector.register(server_socket, selectors.EVENT_READ)
+            
+            # JIT-compile the numba kernel now rather than on the first /bf,
+            # which would stall every client served by the reactor
+            if _run_bf is not None:
+                self.bf.execute('+')
+                self.bf.reset()
+            
             self.running = True
             
             print("🧠🚀 IMPROVED Brainfuck Chat Server Started!")
@@ -173,170 +384,253 @@ class ImprovedChatServer:
             print("-" * 50)
             
             while self.running:
-                try:
-                    client_socket, address = server_socket.accept()
-                    
-                    with self.lock:
-                        self.client_counter += 1
-                        client_id = f"Client_{self.client_counter}"
-                        
-                        self.clients[client_id] = {
-                            'socket': client_socket,
-                            'address': address,
-                            'connected_at': time.time(),
-                            'active': True
-                        }
-                    
-                    print(f"✅ {client_id} connected from {address}")
-                    print(f"   👥 Total clients: {len(self.clients)}")
+                # Wake up periodically so a cleared self.running is noticed
+                for key, mask in self.selector.select(timeout=1.0):
+                    client_id = key.data
                     
-                    # Send welcome message (unencrypted to avoid issues)
-                    welcome = f"🧠 Welcome to Brainfuck Chat! You are {client_id}"
-                    client_socket.send(welcome.encode('utf-8'))
+                    if client_id is None:
+                        self.accept_client(server_socket)
+                        continue
                     
-                    # Notify other clients about new connection
-                    self.broadcast_system_message(f"🔔 {client_id} joined the chat", exclude=client_id)
+                    # The client may have been dropped earlier in this batch
+                    if client_id not in self.clients:
+                        continue
                     
-                    # Start client handler thread
-                    thread = threading.Thread(
-                        target=self.handle_client,
-                        args=(client_id,),
-                        daemon=True
-                    )
-                    thread.start()
+                    if mask & selectors.EVENT_WRITE:
+                        if not self.flush_client(client_id):
+                            self.disconnect_client(client_id)
+                            continue
                     
-                except Exception as e:
-                    if self.running:
-                        print(f"❌ Error accepting client: {e}")
+                    if mask & selectors.EVENT_READ:
+                        self.handle_client(client_id)
                     
         except Exception as e:
             print(f"❌ Server error: {e}")
         finally:
             self.cleanup_server(server_socket)
     
-    def handle_client(self, client_id):
-        """Handle individual client with graceful error handling"""
-        client_info = self.clients.get(client_id)
-        if not client_info:
+    def accept_client(self, server_socket):
+        """Accept a pending connection and register it with the selector"""
+        try:
+            client_socket, address = server_socket.accept()
+        except BlockingIOError:
             return
-            
-        client_socket = client_info['socket']
+        except Exception as e:
+            if self.running:
+                print(f"❌ Error accepting client: {e}")
+            return
+        
+        client_socket.setblocking(False)
+        # Chat messages are small; don't let Nagle hold them back
+        client_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        
+        self.client_counter += 1
+        client_id = f"Client_{self.client_counter}"
+        
+        self.clients[client_id] = {
+            'socket': client_socket,
+            'address': address,
+            'connected_at': time.time(),
+            'active': True,
+            'inbox': bytearray(),
+            'outbox': bytearray(),
+            'events': selectors.EVENT_READ
+        }
+        self.selector.register(client_socket, selectors.EVENT_READ, client_id)
+        
+        print(f"✅ {client_id} connected from {address}")
+        print(f"   👥 Total clients: {len(self.clients)}")
+        
+        # Send welcome message (unencrypted to avoid issues)
+        welcome = f"🧠 Welcome to Brainfuck Chat! You are {client_id}"
+        self.send_to_client(client_id, welcome)
+        
+        # Notify other clients about new connection
+        self.broadcast_system_message(f"🔔 {client_id} joined the chat", exclude=client_id)
+    
+    def handle_client(self, client_id):
+        """Read from a client socket and handle each complete message"""
+        client_info = self.clients[client_id]
         
         try:
-            while self.running and client_info.get('active', False):
-                # Set a timeout to detect disconnections
-                client_socket.settimeout(1.0)
-                
-                try:
-                    data = client_socket.recv(1024).decode('utf-8', errors='ignore')
-                except socket.timeout:
-                    continue  # Continue if no data received within timeout
-                
-                if not data:
-                    print(f"📤 {client_id} disconnected normally")
+            try:
+                received = client_info['socket'].recv_into(self.recv_buffer)
+            except BlockingIOError:
+                return
+            
+            if not received:
+                print(f"📤 {client_id} disconnected normally")
+                self.disconnect_client(client_id)
+                return
+            
+            inbox = client_info['inbox']
+            inbox += self.recv_view[:received]
+            
+            # A read may hold several frames or only part of one; leave
+            # incomplete frames in the inbox until the rest arrives
+            while len(inbox) >= FRAME_HEADER_SIZE and client_id in self.clients:
+                end = FRAME_HEADER_SIZE + int.from_bytes(inbox[:FRAME_HEADER_SIZE], 'big')
+                if len(inbox) < end:
                     break
                 
-                # Decrypt message
-                try:
-                    decrypted_message = self.protocol.decrypt_message(data)
-                except:
-                    decrypted_message = data
-                
-                # Validate message
-                if not self.protocol.validate_message(decrypted_message):
-                    error_msg = "❌ Invalid message format"
-                    self.send_to_client(client_id, error_msg)
-                    continue
-                
-                print(f"💬 {client_id}: {decrypted_message}")
-                
-                # Handle commands
-                if decrypted_message.startswith('/'):
-                    self.handle_command(client_id, decrypted_message)
-                    continue
-                
-                # Broadcast message to all other clients
-                self.broadcast_message(client_id, decrypted_message)
-                
+                data = str(inbox[FRAME_HEADER_SIZE:end], 'utf-8', 'ignore')
+                del inbox[:end]
+                self.handle_message(client_id, data)
+            
         except Exception as e:
             print(f"❌ Error handling {client_id}: {e}")
-        finally:
             self.disconnect_client(client_id)
     
+    def handle_message(self, client_id, data):
+        """Decrypt, validate and dispatch one message from a client"""
+        # Decrypt message
+        try:
+            decrypted_message = self.protocol.decrypt_message(data)
+        except:
+            decrypted_message = data
+        
+        # Validate message
+        if not self.protocol.validate_message(decrypted_message):
+            error_msg = "❌ Invalid message format"
+            self.send_to_client(client_id, error_msg)
+            return
+        
+        print(f"💬 {client_id}: {decrypted_message}")
+        
+        # Handle commands
+        if decrypted_message.startswith('/'):
+            self.handle_command(client_id, decrypted_message)
+            return
+        
+        # Broadcast message to all other clients
+        self.broadcast_message(client_id, decrypted_message)
+    
+    def queue_to_client(self, client_id, payload):
+        """Send payload to a client, keeping whatever the socket doesn't take"""
+        client_info = self.clients.get(client_id)
+        if not client_info or not client_info.get('active', False):
+            return False
+        
+        outbox = client_info['outbox']
+        if outbox:
+            # Earlier data is still waiting; queue behind it to keep the order
+            if len(outbox) + len(payload) > MAX_OUTBOX_SIZE:
+                print(f"❌ {client_id} is not reading; outbox full")
+                return False
+            outbox += payload
+            return self.flush_client(client_id)
+        
+        # Usually the socket takes it all, so a broadcast payload is shared
+        # by every recipient and only an unsent tail is ever copied
+        try:
+            sent = client_info['socket'].send(payload)
+        except (BlockingIOError, InterruptedError):
+            sent = 0
+        except Exception as e:
+            print(f"❌ Failed to send to {client_id}: {e}")
+            return False
+        
+        if sent < len(payload):
+            if len(payload) - sent > MAX_OUTBOX_SIZE:
+                print(f"❌ {client_id} is not reading; outbox full")
+                return False
+            outbox += payload[sent:]
+            self.update_events(client_id)
+        return True
+    
+    def flush_client(self, client_id):
+        """Send as much of a client's outbox as the socket accepts"""
+        client_info = self.clients[client_id]
+        outbox = client_info['outbox']
+        
+        try:
+            if outbox:
+                sent = client_info['socket'].send(outbox)
+                del outbox[:sent]
+        except (BlockingIOError, InterruptedError):
+            pass
+        except Exception as e:
+            print(f"❌ Failed to send to {client_id}: {e}")
+            return False
+        
+        self.update_events(client_id)
+        return True
+    
+    def update_events(self, client_id):
+        """Watch for writability only while a client's outbox is non-empty"""
+        client_info = self.clients[client_id]
+        events = selectors.EVENT_READ
+        if client_info['outbox']:
+            events |= selectors.EVENT_WRITE
+        
+        if events != client_info['events']:
+            self.selector.modify(client_info['socket'], events, client_id)
+            client_info['events'] = events
+    
     def broadcast_message(self, sender_id, message):
         """Broadcast message to all other clients"""
         broadcast_msg = f"{sender_id}: {message}"
+        payload = frame_message(self.protocol.encrypt_message(broadcast_msg).encode('utf-8'))
         
-        with self.lock:
-            clients_to_remove = []
-            
-            for client_id, client_info in self.clients.items():
-                if client_id != sender_id and client_info.get('active', False):
-                    try:
-                        encrypted_msg = self.protocol.encrypt_message(broadcast_msg)
-                        client_info['socket'].send(encrypted_msg.encode('utf-8'))
-                    except Exception as e:
-                        print(f"❌ Failed to send to {client_id}: {e}")
-                        clients_to_remove.append(client_id)
-            
-            # Remove failed clients
-            for client_id in clients_to_remove:
-                self.disconnect_client(client_id)
+        clients_to_remove = []
+        for client_id in list(self.clients):
+            if client_id != sender_id and not self.queue_to_client(client_id, payload):
+                clients_to_remove.append(client_id)
+        
+        # Remove failed clients
+        for client_id in clients_to_remove:
+            self.disconnect_client(client_id)
     
     def broadcast_system_message(self, message, exclude=None):
         """Broadcast system message to all clients"""
-        with self.lock:
-            clients_to_remove = []
-            
-            for client_id, client_info in self.clients.items():
-                if client_id != exclude and client_info.get('active', False):
-                    try:
-                        client_info['socket'].send(message.encode('utf-8'))
-                    except Exception as e:
-                        clients_to_remove.append(client_id)
-            
-            # Remove failed clients
-            for client_id in clients_to_remove:
-                self.disconnect_client(client_id)
+        payload = frame_message(message.encode('utf-8'))
+        
+        clients_to_remove = []
+        for client_id in list(self.clients):
+            if client_id != exclude and not self.queue_to_client(client_id, payload):
+                clients_to_remove.append(client_id)
+        
+        # Remove failed clients
+        for client_id in clients_to_remove:
+            self.disconnect_client(client_id)
     
     def send_to_client(self, client_id, message):
         """Send message to specific client"""
-        with self.lock:
-            client_info = self.clients.get(client_id)
-            if client_info and client_info.get('active', False):
-                try:
-                    client_info['socket'].send(message.encode('utf-8'))
-                    return True
-                except Exception as e:
-                    print(f"❌ Failed to send to {client_id}: {e}")
-                    self.disconnect_client(client_id)
-                    return False
+        if client_id not in self.clients:
+            return False
+        
+        if self.queue_to_client(client_id, frame_message(message.encode('utf-8'))):
+            return True
+        
+        self.disconnect_client(client_id)
         return False
     
     def disconnect_client(self, client_id):
         """Gracefully disconnect a client"""
-        with self.lock:
-            client_info = self.clients.get(client_id)
-            if client_info:
-                client_info['active'] = False
-                
-                try:
-                    client_info['socket'].close()
-                except:
-                    pass
-                
-                del self.clients[client_id]
-                print(f"👋 {client_id} disconnected")
-                print(f"   👥 Remaining clients: {len(self.clients)}")
-                
-                # Notify other clients
-                self.broadcast_system_message(f"📤 {client_id} left the chat", exclude=client_id)
+        client_info = self.clients.pop(client_id, None)
+        if client_info:
+            client_info['active'] = False
+            
+            try:
+                self.selector.unregister(client_info['socket'])
+            except (KeyError, ValueError):
+                pass
+            
+            try:
+                client_info['socket'].close()
+            except:
+                pass
+            
+            print(f"👋 {client_id} disconnected")
+            print(f"   👥 Remaining clients: {len(self.clients)}")
+            
+            # Notify other clients
+            self.broadcast_system_message(f"📤 {client_id} left the chat", exclude=client_id)
     
     def handle_command(self, client_id, command):
         """Handle special commands"""
         if command == '/users':
-            with self.lock:
-                user_list = f"👥 Connected users: {', '.join(self.clients.keys())}"
+            user_list = f"👥 Connected users: {', '.join(self.clients.keys())}"
             self.send_to_client(client_id, user_list)
         
         elif command == '/time':
@@ -347,12 +641,12 @@ class ImprovedChatServer:
         elif command.startswith('/bf '):
             bf_code = command[4:]
             try:
-                self.protocol.bf.reset()
-                self.protocol.bf.load_input("Hello!")
-                success = self.protocol.bf.execute(bf_code, max_steps=5000)
+                self.bf.reset()
+                self.bf.load_input("Hello!")
+                success = self.bf.execute(bf_code, max_steps=5000)
+                bf_output = self.bf.get_output_string()
                 
                 if success:
-                    bf_output = self.protocol.bf.get_output_string()
                     response = f"🧠 BF Output: '{bf_output}'"
                 else:
                     response = "❌ BF Error: Program failed or exceeded step limit"
@@ -379,19 +673,20 @@ class ImprovedChatServer:
         """Clean shutdown"""
         self.running = False
         
-        with self.lock:
-            for client_id, client_info in list(self.clients.items()):
-                try:
-                    client_info['socket'].close()
-                except:
-                    pass
-            self.clients.clear()
+        for client_id, client_info in list(self.clients.items()):
+            try:
+                client_info['socket'].close()
+            except:
+                pass
+        self.clients.clear()
         
         try:
             server_socket.close()
         except:
             pass
         
+        self.selector.close()
+        
         print("🔒 Server shutdown complete")
 
 class ImprovedChatClient:
@@ -429,14 +724,25 @@ class ImprovedChatClient:
     
     def receive_messages(self):
         """Receive messages with improved UI handling"""
+        header = bytearray(FRAME_HEADER_SIZE)
+        buffer = bytearray(MAX_FRAME_SIZE)
+        view = memoryview(buffer)
+        
         while self.connected:
             try:
-                data = self.socket.recv(1024).decode('utf-8', errors='ignore')
-                if not data:
+                if not recv_exact(self.socket, memoryview(header)):
                     print("\n💔 Connection lost")
                     self.connected = False
                     break
                 
+                length = int.from_bytes(header, 'big')
+                if not recv_exact(self.socket, view[:length]):
+                    print("\n💔 Connection lost")
+                    self.connected = False
+                    break
+                
+                data = str(view[:length], 'utf-8', 'ignore')
+                
                 # Try to decrypt
                 try:
                     decrypted_message = self.protocol.decrypt_message(data)
@@ -487,7 +793,10 @@ class ImprovedChatClient:
                     # Encrypt and send
                     try:
                         encrypted_message = self.protocol.encrypt_message(message)
-                        self.socket.send(encrypted_message.encode('utf-8'))
+                        self.socket.sendall(frame_message(encrypted_message.encode('utf-8')))
+                    except ValueError as e:
+                        print(f"⚠️ {e}")
+                        continue
                     except Exception as e:
                         print(f"⚠️ Send failed: {e}")
                         break
@@ -583,6 +892,38 @@ def test_bf_functions():
         print(f"  Valid: {is_valid}")
         success = (msg == decrypted)
         print(f"  Roundtrip: {'✅ SUCCESS' if success else '❌ FAILED'}")
+    
+    print("\n🧠 TESTING BRAINFUCK ENGINE")
+    print("-" * 30)
+    
+    engine = ImprovedBrainfuckEngine()
+    hello_world = ("++++++++[>++++[>++>+++>+++>+<<<<-]>+>+>->>+[<]<-]"
+                   ">>.>---.+++++++..+++.>>.<-.<.+++.------.--------.>>+.>++.")
+    
+    # (name, code, expected result, expected output, expected pointer)
+    engine_tests = [
+        ("Hello World", hello_world, True, b"Hello World!\n", None),
+        ("Clear [-]", "+++[-]+.", True, b"\x01", 0),
+        ("Clear [+]", "+++[+]+.", True, b"\x01", 0),
+        ("Scan [>]", "+>+>+<<[>]", True, b"", 3),
+        ("Scan [>] wrapping", "+<+<+[>]", True, b"", 1),
+        ("Scan [<]", ">>+>+[<]", True, b"", 1),
+        ("Scan [<] wrapping", "+>+>+[<]", True, b"", MEMORY_SIZE - 1),
+        ("'<' wraps from cell 0", "<+.", True, b"\x01", MEMORY_SIZE - 1),
+        ("Unmatched '['", "[.+", True, b"", 0),
+        ("Unmatched ']'", "+.-]", True, b"\x01", 0),
+        ("Step limit", "+[]", False, b"", None),
+    ]
+    
+    for name, code, expected_result, expected_output, expected_pointer in engine_tests:
+        print(f"\nTesting: {name} ('{code[:30]}')")
+        engine.reset()
+        result = engine.execute(code, max_steps=5000)
+        output = bytes(engine.output_buffer)
+        print(f"  Result: {result}, Output: {output!r}, Pointer: {engine.pointer}")
+        success = (result == expected_result and output == expected_output and
+                   (expected_pointer is None or engine.pointer == expected_pointer))
+        print(f"  Check: {'✅ SUCCESS' if success else '❌ FAILED'}")
 
 if __name__ == "__main__":
     main()